@@ -14,7 +14,7 @@
 # - Export: CSV/XLSX, Google Sheets
 #
 # Usage:
-#   pip install streamlit requests beautifulsoup4 lxml pandas xlsxwriter urllib3 gspread google-auth
+#   pip install streamlit requests beautifulsoup4 soupsieve lxml pandas xlsxwriter urllib3 gspread google-auth orjson
 #   streamlit run app.py
 
 import re
@@ -24,15 +24,25 @@ import json
 import time
 import html
 import random
-from typing import List, Dict, Optional
+import functools
+import importlib.util
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Iterator, Optional, Set, Tuple
 from urllib.parse import urljoin, urlparse
 
+import lxml.etree
+import lxml.html
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
+import soupsieve
+import xlsxwriter
+from bs4 import BeautifulSoup, SoupStrainer
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Optional: Google Sheets
 try:
@@ -42,6 +52,17 @@ try:
 except Exception:
     HAS_GSHEETS = False
 
+# Optional: orjson (faster JSON-LD parsing)
+try:
+    import orjson
+    json_loads = orjson.loads
+except Exception:
+    json_loads = json.loads
+
+# Optional: calamine (fast XLSX reader) and pyarrow (CSV reader, Arrow string dtype)
+HAS_CALAMINE = importlib.util.find_spec("python_calamine") is not None
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
 # ----------------------------
 # Streamlit Page Setup
 # ----------------------------
@@ -63,22 +84,74 @@ UA_ROTATE = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15",
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36",
 ]
+# Round-robin from a shuffled start (one random draw per run, not per request)
+next_ua = itertools.cycle(random.sample(UA_ROTATE, len(UA_ROTATE))).__next__
 
 DEFAULT_HEADERS = {
     "Accept-Language": "en-US,en;q=0.9",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
     "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
 }
 
 EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}\b")
-PHONE_RE = re.compile(r"(?:(?:\+?1[\s\-\.]?)?(?:\(?\d{3}\)?[\s\-\.]?)\d{3}[\s\-\.]?\d{4})", re.MULTILINE | re.DOTALL)
-
+PHONE_RE = re.compile(r"(?:\+?1[\s.\-]?)?\(?\d{3}\)?[\s.\-]?\d{3}[\s.\-]?\d{4}")
+# Email-or-phone in a single left-to-right pass (see scan_contacts)
+CONTACT_RE = re.compile(f"(?P<email>{EMAIL_RE.pattern})|(?P<phone>{PHONE_RE.pattern})")
+# Pagination links (".../miami-fl/2") on listing pages are never property details
+PAGINATION_URL_RE = re.compile(r"/\d{1,3}$")
+MANAGED_BY_RE = re.compile(r"Managed by", re.I)
+MANAGED_BY_OR_MGMT_RE = re.compile(r"Managed by|Management", re.I)
+
+HTML_PARSER = "lxml"  # C-backed; bs4's find/select API is parser-agnostic
+
+DETAIL_WORKERS = 16  # concurrent fetches overall; per-host load is capped by PER_HOST_LIMIT
+# (connect, read) seconds: fail fast on dead hosts, bound slow bodies so a
+# stalled page can't hold a worker for long
+REQUEST_TIMEOUT = (4, 12)
+PER_HOST_LIMIT = 4  # concurrent requests per host (see host_slot)
+MAX_BODY_BYTES = 1_500_000  # larger pages are truncated (see read_capped)
+UI_UPDATE_EVERY = 10  # items between progress-bar/status refreshes
+PREVIEW_ROWS = 200  # rows sent to the browser in result tables (downloads have all)
+
+# Raw-byte markers, one of which must appear (lowercased) for *_is_property_detail
+# to possibly pass: the "Managed by" label, the detail widgets, or a JSON-LD block
+APTS_DETAIL_MARKERS = (b"managed by", b"floor-plan", b"application/ld+json")
+RENTCAFE_DETAIL_MARKERS = (b"managed by", b"management", b"community", b"application/ld+json")
+
+# Listing-card selectors: one compiled selector group per site, so each listing
+# page is walked once (matches come back in document order, each anchor once)
+APTS_LINK_SELECT = soupsieve.compile(", ".join((
+    "a.property-link",
+    'a[data-test-id*="property-card-link"]',
+    'a[data-tile-track*="PropertyCard"]',
+    'a[href*="/property/"]',
+    'a[href*="/apartments/"]',
+)))
+RENTCAFE_LINK_SELECT = soupsieve.compile(", ".join((
+    "a.card-title, a.property-title, a.btn-details, .property-name a, .js-CommunityName a",
+    'a[href*="/apartments/"]',
+)))
+
+# Address candidates as one selector group: a single tree walk, first match in
+# document order. ("address" also covers "property-address".)
+APTS_ADDRESS_SELECT = soupsieve.compile('[data-testid*="address" i], address, div[class*="address" i]')
+RENTCAFE_ADDRESS_SELECT = soupsieve.compile(".community-address, .address, address")
+
+# Listing pages whose selectors are all bare a[...] matches only need anchors +
+# JSON-LD; skip building the rest of the DOM. (Not RentCafe: ".property-name a"
+# needs the container elements.)
+LISTING_STRAINER = SoupStrainer(["a", "script"])
+
+# Bytes patterns: matched against the raw body, no decode needed
 CAPTCHA_PATTERNS = [
-    re.compile(r"are you human|captcha|verif(y|ication)|unusual traffic", re.I),
-    re.compile(r"Just a moment\.", re.I), # common CDN interstitial
+    re.compile(rb"are you human|captcha|verif(y|ication)|unusual traffic", re.I),
+    re.compile(rb"Just a moment\.", re.I), # common CDN interstitial
 ]
 
+@st.cache_resource(show_spinner=False)
 def make_session(referer: str = "") -> requests.Session:
+    # Cached across reruns so pooled keep-alive/TLS connections survive widget changes
     s = requests.Session()
     retry = Retry(
         total=4,
@@ -87,58 +160,185 @@ def make_session(referer: str = "") -> requests.Session:
         allowed_methods=["GET", "HEAD"],
         raise_on_status=False,
     )
-    s.mount("https://", HTTPAdapter(max_retries=retry))
-    s.mount("http://", HTTPAdapter(max_retries=retry))
+    # Large pool: one slot per host (listing site + many mgmt sites), plenty of
+    # connections per host for DETAIL_WORKERS; never block, just open extra.
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=32, pool_maxsize=64, pool_block=False)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
     s.headers.update(DEFAULT_HEADERS)
-    s.headers["User-Agent"] = random.choice(UA_ROTATE)
+    s.headers["User-Agent"] = next_ua()
     if referer:
         s.headers["Referer"] = referer
     return s
 
 def polite_sleep(min_s: float, max_s: float):
-    time.sleep(random.uniform(min_s, max_s))
+    time.sleep(min_s + (max_s - min_s) * random.random())
 
-def looks_blocked(text: str) -> bool:
-    t = text[:5000]  # check first chunk
+def looks_blocked(content: bytes) -> bool:
+    t = content[:5000]  # check first chunk
     for pat in CAPTCHA_PATTERNS:
         if pat.search(t):
             return True
     return False
 
-def safe_get(session: requests.Session, url: str, timeout: int = 25):
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+_host_slots_lock = threading.Lock()
+
+def host_slot(url: str) -> threading.BoundedSemaphore:
+    # At most PER_HOST_LIMIT requests in flight per host, whatever the worker count
+    host = url_host(url).lower()
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+    return slot
+
+def safe_get(session: requests.Session, url: str, timeout: Tuple[float, float] = REQUEST_TIMEOUT,
+             delay: Optional[Tuple[float, float]] = None):
+    # delay=(min, max) sleeps while holding the host slot, so the jitter spaces
+    # requests to that host without stalling fetches to other hosts
     try:
-        session.headers["User-Agent"] = random.choice(UA_ROTATE)
-        resp = session.get(url, timeout=timeout)
-        if resp is None:
-            return None
-        if resp.status_code in (403, 429):
-            polite_sleep(1.0, 2.0)
-            session.headers["User-Agent"] = random.choice(UA_ROTATE)
-            resp = session.get(url, timeout=timeout)
-        return resp
+        with host_slot(url):
+            if delay:
+                polite_sleep(*delay)
+            # UA is rotated only after a 403/429, not on every request
+            resp = session.get(url, timeout=timeout, stream=True)
+            if resp is None:
+                return None
+            if resp.status_code in (403, 429):
+                resp.close()
+                polite_sleep(1.0, 2.0)
+                session.headers["User-Agent"] = next_ua()
+                resp = session.get(url, timeout=timeout, stream=True)
+            read_capped(resp)
+            return resp if resp.content else None
     except requests.RequestException:
         return None
 
+def read_capped(resp: requests.Response) -> requests.Response:
+    # Buffer at most MAX_BODY_BYTES (decoded). A bigger page is truncated and its
+    # connection dropped rather than drained; what we extract sits near the top.
+    chunks, size = [], 0
+    for chunk in resp.iter_content(64 * 1024):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= MAX_BODY_BYTES:
+            resp.close()
+            break
+    resp._content = b"".join(chunks)[:MAX_BODY_BYTES]
+    resp._content_consumed = True
+    return resp
+
+def report_progress(bar, done: int, total: int, status=None, label: str = ""):
+    # Every widget update is a websocket frame to the browser, so refresh the
+    # bar (and the single status line, an st.empty) only every UI_UPDATE_EVERY items
+    if done % UI_UPDATE_EVERY == 0 or done == total:
+        bar.progress(min(done/total, 1.0))
+        if status is not None:
+            status.caption(label)
+
+def run_parallel(fn, items: List[str], max_workers: int = DETAIL_WORKERS):
+    # Yields (item, result) as each fn(item) finishes (completion order; see
+    # collect_detail_rows for input order). Workers share the script
+    # context so st.* calls made inside fn still reach the page.
+    ctx = get_script_run_ctx()
+
+    def work(item):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(item)
+
+    # No with-block: its exit waits for every queued future. If the consumer
+    # stops early (rerun/Stop, or a worker raised), drop the queued fetches.
+    ex = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {ex.submit(work, it): it for it in items}
+        for fut in as_completed(futures):
+            yield futures[fut], fut.result()
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+
+def may_be_property_detail(content: bytes, markers) -> bool:
+    # Substring scan in C; lets non-detail pages skip the BeautifulSoup parse
+    low = content.lower()
+    return any(m in low for m in markers)
+
+def scan_contacts(text: str) -> Tuple[str, str]:
+    # First email and first phone in text, walking it once instead of once per regex
+    email = phone = ""
+    for m in CONTACT_RE.finditer(text):
+        if not email and m.group("email"):
+            email = m.group("email")
+        elif not phone and m.group("phone"):
+            phone = m.group("phone")
+        if email and phone:
+            break
+    return email, phone
+
 def clean_text(x: str) -> str:
     if not x:
         return ""
-    return " ".join(html.unescape(x).split())
+    # Most scraped strings carry no entities; skip the unescape pass for those
+    if "&" in x:
+        x = html.unescape(x)
+    return " ".join(x.split())
 
 def first_nonempty(*args):
     for a in args:
-        if a and str(a).strip():
-            return clean_text(str(a))
+        if a:
+            t = clean_text(str(a))
+            if t:
+                return t
     return ""
 
+def url_host(url: str) -> str:
+    # netloc of an absolute URL by string split (no urlparse tuple per anchor);
+    # "" for scheme-only links such as javascript:/mailto:
+    parts = url.split("/", 3)
+    return parts[2].partition("?")[0].partition("#")[0] if len(parts) > 2 else ""
+
+@functools.lru_cache(maxsize=4096)
+def normalize_link(base_url: str, href: str) -> str:
+    # Absolute URL without query string or trailing slash. Cached because a
+    # listing card repeats one href across its image/title/button anchors.
+    return urljoin(base_url, href).split("?")[0].rstrip("/")
+
+def make_soup(resp: requests.Response, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    # lxml gets the raw bytes. Pin the encoding only if the server declared one:
+    # for undeclared text/html requests guesses ISO-8859-1, which mangles UTF-8
+    # pages, so in that case let bs4 sniff <meta charset> / the BOM instead.
+    declared = "charset=" in resp.headers.get("Content-Type", "").lower()
+    return BeautifulSoup(resp.content, HTML_PARSER, from_encoding=resp.encoding if declared else None,
+                         parse_only=parse_only)
+
+def page_text(soup: BeautifulSoup) -> str:
+    # Full visible text, computed once per soup and reused by every regex scan
+    text = vars(soup).get("_page_text")
+    if text is None:
+        text = soup._page_text = soup.get_text(" ", strip=True)
+    return text
+
 # ----------------------------
 # JSON-LD utilities (helps when listing pages are JS-heavy)
 # ----------------------------
 
 def parse_json_ld_nodes(soup: BeautifulSoup) -> List[dict]:
+    # Memoized on the soup: detection and link extraction may both ask for it.
+    # (vars() lookup, since Tag.__getattr__ would search the tree for <_ld_nodes>)
+    cached = vars(soup).get("_ld_nodes")
+    if cached is not None:
+        return cached
     nodes = []
-    for tag in soup.select('script[type="application/ld+json"]'):
+    # Plain name/attr match: skips compiling and evaluating a CSS selector per page
+    for tag in soup.find_all("script", attrs={"type": "application/ld+json"}):
+        # .string avoids a recursive text gather; str() because orjson rejects
+        # str subclasses such as NavigableString
+        raw = tag.string
+        text = str(raw) if raw is not None else tag.get_text()
+        # Every consumer filters on @type; blocks without one aren't worth decoding
+        if '"@type"' not in text:
+            continue
         try:
-            data = json.loads(tag.get_text(strip=True))
+            data = json_loads(text)
         except Exception:
             continue
         if isinstance(data, dict):
@@ -152,9 +352,21 @@ def parse_json_ld_nodes(soup: BeautifulSoup) -> List[dict]:
             flat.extend([g for g in d["@graph"] if isinstance(g, dict)])
         else:
             flat.append(d)
+    soup._ld_nodes = flat
     return flat
 
 
+def json_ld_has_place(soup: BeautifulSoup) -> bool:
+    # ApartmentComplex / Place style JSON-LD marks a property detail page
+    for node in parse_json_ld_nodes(soup):
+        t = node.get("@type")
+        if isinstance(t, str) and ("Apartment" in t or "Place" in t):
+            return True
+        if isinstance(t, list) and any("Apartment" in x or "Place" in x for x in t):
+            return True
+    return False
+
+
 def extract_itemlist_links(soup: BeautifulSoup, base_url: str) -> List[str]:
     links = []
     for node in parse_json_ld_nodes(soup):
@@ -167,18 +379,10 @@ def extract_itemlist_links(soup: BeautifulSoup, base_url: str) -> List[str]:
                         item = e.get("item") if isinstance(e.get("item"), dict) else e
                         url = item.get("url") or item.get("@id") or e.get("url")
                         if url:
-                            full = urljoin(base_url, url)
-                            links.append(full.split("?")[0].rstrip("/"))
+                            links.append(normalize_link(base_url, url))
                 except Exception:
                     pass
-    # de-dup
-    out = []
-    seen = set()
-    for u in links:
-        if u not in seen:
-            out.append(u)
-            seen.add(u)
-    return out
+    return list(dict.fromkeys(links))
 
 # ----------------------------
 # Site-specific: Apartments.com
@@ -193,134 +397,39 @@ def apts_build_listing_urls(city: str, state: str, pages: int) -> List[str]:
         else:
             urls.append(f"{base}?page={p}")
             urls.append(urljoin(base, f"{p}/"))
-    # de-dup
-    out, seen = [], set()
-    for u in urls:
-        if u not in seen:
-            out.append(u)
-            seen.add(u)
-    return out
+    return list(dict.fromkeys(urls))
 
 
-def apts_collect_property_links(soup: BeautifulSoup, base_url: str) -> List[str]:
-    links = set()
+def apts_collect_property_links(soup: BeautifulSoup, base_url: str, seen: Optional[Set[str]] = None) -> Iterator[str]:
+    # Yields only URLs not already in seen (shared across listing pages)
+    seen = set() if seen is None else seen
     # 1) Try common anchors on modern pages
-    selectors = [
-        "a.property-link",
-        'a[data-test-id*="property-card-link"]',
-        'a[data-tile-track*="PropertyCard"]',
-        'a[href*="/property/"]',
-        'a[href*="/apartments/"]',
-    ]
-    for sel in selectors:
-        for a in soup.select(sel):
-            href = a.get("href", "")
-            if not href:
-                continue
-            full = urljoin(base_url, href)
-            if "apartments.com" in urlparse(full).netloc:
-                links.add(full.split("?")[0].rstrip("/"))
+    for a in APTS_LINK_SELECT.select(soup):
+        href = a.get("href", "")
+        if not href:
+            continue
+        u = normalize_link(base_url, href)
+        if "apartments.com" in url_host(u) and u not in seen and not PAGINATION_URL_RE.search(u):
+            seen.add(u)
+            yield u
 
     # 2) Fallback: parse JSON-LD ItemList (works even when cards are JS-rendered)
     for u in extract_itemlist_links(soup, base_url):
-        if "apartments.com" in urlparse(u).netloc:
-            links.add(u)
-
-    return list(links)
+        if "apartments.com" in url_host(u) and u not in seen and not PAGINATION_URL_RE.search(u):
+            seen.add(u)
+            yield u
 
 
-def apts_is_property_detail(soup: BeautifulSoup) -> bool:
+def apts_is_property_detail(soup: BeautifulSoup, has_managed_by: Optional[bool] = None) -> bool:
+    # has_managed_by lets the extractor reuse its own label lookup
+    if has_managed_by is None:
+        has_managed_by = soup.find(string=MANAGED_BY_RE) is not None
     # Heuristics: "Managed by" label, floor-plan widget, or ApartmentComplex JSON-LD
-    if soup.find(string=re.compile(r"Managed by", re.I)):
+    if has_managed_by:
         return True
     if soup.select_one('[data-testid*="floor-plan"]'):
         return True
-    for node in parse_json_ld_nodes(soup):
-        t = node.get("@type")
-        if isinstance(t, str) and ("Apartment" in t or "Place" in t):
-            return True
-        if isinstance(t, list) and any("Apartment" in x or "Place" in x for x in t):
-            return True
-    return False
-
-
-def apts_extract_details(session: requests.Session, url: str, follow_mgmt: bool, delay_min: float, delay_max: float) -> Optional[Dict]:
-    r = safe_get(session, url, 25)
-    if not (r and r.ok):
-        return None
-    if looks_blocked(r.text):
-        st.warning("Apartments.com property page appears blocked by anti-bot. Try Manual URLs mode or increase delays.")
-        return None
-    soup = BeautifulSoup(r.text, "html.parser")
-    if not apts_is_property_detail(soup):
-        return None
-
-    name = ""; address = ""; mgmt = ""; phone = ""; email = ""; mgmt_url = ""
-
-    # Name
-    h1 = soup.find(["h1", "h2"], string=True)
-    if h1:
-        name = clean_text(h1.get_text())
-
-    # Address
-    addr_tag = soup.find(attrs={"data-testid": re.compile(r"property-address|address", re.I)}) or \
-               soup.find("address") or \
-               soup.find("div", class_=re.compile(r"property-address|address", re.I))
-    if addr_tag:
-        address = clean_text(addr_tag.get_text())
-
-    # Phone
-    tel = soup.select_one('a[href^="tel:"]')
-    if tel:
-        phone = clean_text(tel.get_text() or tel.get("href", "").replace("tel:", ""))
-    if not phone:
-        m = PHONE_RE.search(soup.get_text(" ", strip=True))
-        if m:
-            phone = clean_text(m.group(0))
-
-    # Management + mgmt_url
-    label = soup.find(string=re.compile(r"Managed by", re.I))
-    if label:
-        block = label.parent if hasattr(label, "parent") else None
-        if block:
-            link = block.find("a", href=True) or (block.find_next("a", href=True) if block else None)
-            if link:
-                mgmt = first_nonempty(mgmt, link.get_text())
-                href = link["href"]
-                mgmt_url = href if href.startswith("http") else urljoin(url, href)
-            else:
-                mgmt = first_nonempty(mgmt, block.get_text())
-
-    # Follow management site
-    if follow_mgmt and mgmt_url:
-        polite_sleep(delay_min, delay_max)
-        r2 = safe_get(session, mgmt_url, 25)
-        if r2 and r2.ok and not looks_blocked(r2.text):
-            s2 = BeautifulSoup(r2.text, "html.parser")
-            if not email:
-                m = EMAIL_RE.search(s2.get_text(" ", strip=True))
-                if m:
-                    email = m.group(0)
-            if not phone:
-                t2 = s2.select_one('a[href^="tel:"]')
-                if t2:
-                    phone = clean_text(t2.get_text() or t2.get("href", "").replace("tel:", ""))
-            if not email:
-                mlinks = [a.get("href") for a in s2.select('a[href^="mailto:"]')]
-                mlinks = [x.replace("mailto:", "") for x in mlinks if x]
-                if mlinks:
-                    email = clean_text(mlinks[0])
-
-    return {
-        "Property Name": name,
-        "Address": address,
-        "Management Company": mgmt,
-        "Phone": phone,
-        "Email": email,
-        "Source URL": url,
-        "Mgmt URL": mgmt_url,
-        "Source": "Apartments.com",
-    }
+    return json_ld_has_place(soup)
 
 # ----------------------------
 # Site-specific: RentCafe
@@ -331,77 +440,109 @@ def rentcafe_build_listing_urls(city: str, state: str, pages: int) -> List[str]:
     return [base if p == 1 else f"{base}?page={p}" for p in range(1, pages + 1)]
 
 
-def rentcafe_collect_property_links(soup: BeautifulSoup, base_url: str) -> List[str]:
-    links = set()
-    selectors = [
-        "a.card-title, a.property-title, a.btn-details, .property-name a, .js-CommunityName a",
-        'a[href*="/apartments/"]',
-    ]
-    for sel in selectors:
-        for a in soup.select(sel):
-            href = a.get("href", "")
-            if not href:
-                continue
-            full = urljoin(base_url, href)
-            if "rentcafe.com" in urlparse(full).netloc:
-                links.add(full.split("?")[0].rstrip("/"))
+def rentcafe_collect_property_links(soup: BeautifulSoup, base_url: str, seen: Optional[Set[str]] = None) -> Iterator[str]:
+    # Yields only URLs not already in seen (shared across listing pages)
+    seen = set() if seen is None else seen
+    for a in RENTCAFE_LINK_SELECT.select(soup):
+        href = a.get("href", "")
+        if not href:
+            continue
+        u = normalize_link(base_url, href)
+        if "rentcafe.com" in url_host(u) and u not in seen and not PAGINATION_URL_RE.search(u):
+            seen.add(u)
+            yield u
 
     # JSON-LD ItemList fallback
     for u in extract_itemlist_links(soup, base_url):
-        if "rentcafe.com" in urlparse(u).netloc:
-            links.add(u)
-
-    return list(links)
+        if "rentcafe.com" in url_host(u) and u not in seen and not PAGINATION_URL_RE.search(u):
+            seen.add(u)
+            yield u
 
 
-def rentcafe_is_property_detail(soup: BeautifulSoup) -> bool:
-    if soup.find(string=re.compile(r"Managed by|Management", re.I)):
+def rentcafe_is_property_detail(soup: BeautifulSoup, has_managed_by: Optional[bool] = None) -> bool:
+    # has_managed_by lets the extractor reuse its own label lookup
+    if has_managed_by is None:
+        has_managed_by = soup.find(string=MANAGED_BY_OR_MGMT_RE) is not None
+    if has_managed_by:
         return True
     if soup.select_one(".community-details, .community-header, #communityName"):
         return True
-    for node in parse_json_ld_nodes(soup):
-        t = node.get("@type")
-        if isinstance(t, str) and ("Apartment" in t or "Place" in t):
-            return True
-        if isinstance(t, list) and any("Apartment" in x or "Place" in x for x in t):
-            return True
-    return False
+    return json_ld_has_place(soup)
 
+# ----------------------------
+# Property detail extraction (one extractor, per-site config)
+# ----------------------------
+
+SITE_CONF = {
+    "apartments.com": {
+        "source": "Apartments.com",
+        "markers": APTS_DETAIL_MARKERS,
+        "mgmt_label_re": MANAGED_BY_RE,
+        "is_detail": apts_is_property_detail,
+        "find_name": lambda soup: soup.find(["h1", "h2"], string=True),
+        "address_select": APTS_ADDRESS_SELECT,
+    },
+    "rentcafe.com": {
+        "source": "RentCafe",
+        "markers": RENTCAFE_DETAIL_MARKERS,
+        "mgmt_label_re": MANAGED_BY_OR_MGMT_RE,
+        "is_detail": rentcafe_is_property_detail,
+        "find_name": lambda soup: soup.select_one("#communityName, h1, .community-header h1"),
+        "address_select": RENTCAFE_ADDRESS_SELECT,
+    },
+}
+
+
+def site_key(url: str) -> Optional[str]:
+    host = url_host(url).lower()
+    for key in SITE_CONF:
+        if key in host:
+            return key
+    return None
 
-def rentcafe_extract_details(session: requests.Session, url: str, follow_mgmt: bool, delay_min: float, delay_max: float) -> Optional[Dict]:
-    r = safe_get(session, url, 25)
+
+def extract_details(session: requests.Session, url: str, conf: Dict,
+                    delay_min: float, delay_max: float) -> Optional[Dict]:
+    # Property page only; the management-site follow happens in get_property_details
+    r = safe_get(session, url, delay=(delay_min, delay_max))
     if not (r and r.ok):
         return None
-    if looks_blocked(r.text):
-        st.warning("RentCafe property page appears blocked by anti-bot. Try Manual URLs mode or increase delays.")
+    if looks_blocked(r.content):
+        st.warning(f"{conf['source']} property page appears blocked by anti-bot. Try Manual URLs mode or increase delays.")
+        return None
+    if not may_be_property_detail(r.content, conf["markers"]):
         return None
-    soup = BeautifulSoup(r.text, "html.parser")
-    if not rentcafe_is_property_detail(soup):
+    soup = make_soup(r)
+    label = soup.find(string=conf["mgmt_label_re"])
+    if not conf["is_detail"](soup, has_managed_by=label is not None):
         return None
 
     name = ""; address = ""; mgmt = ""; phone = ""; email = ""; mgmt_url = ""
 
-    name_tag = soup.select_one("#communityName, h1, .community-header h1")
+    # Name
+    name_tag = conf["find_name"](soup)
     if name_tag:
         name = clean_text(name_tag.get_text())
 
-    addr_tag = soup.select_one(".community-address, .address, address")
+    # Address
+    addr_tag = conf["address_select"].select_one(soup)
     if addr_tag:
         address = clean_text(addr_tag.get_text())
 
+    # Phone
     tel = soup.select_one('a[href^="tel:"]')
     if tel:
         phone = clean_text(tel.get_text() or tel.get("href", "").replace("tel:", ""))
     if not phone:
-        m = PHONE_RE.search(soup.get_text(" ", strip=True))
+        m = PHONE_RE.search(page_text(soup))
         if m:
             phone = clean_text(m.group(0))
 
-    mgmt_label = soup.find(string=re.compile(r"Managed by|Management", re.I))
-    if mgmt_label:
-        block = mgmt_label.parent if hasattr(mgmt_label, "parent") else None
+    # Management + mgmt_url (label found above)
+    if label:
+        block = label.parent if hasattr(label, "parent") else None
         if block:
-            link = block.find("a", href=True) or (block.find_next("a", href=True) if block else None)
+            link = block.find("a", href=True) or block.find_next("a", href=True)
             if link:
                 mgmt = first_nonempty(mgmt, link.get_text())
                 href = link["href"]
@@ -409,25 +550,6 @@ def rentcafe_extract_details(session: requests.Session, url: str, follow_mgmt: b
             else:
                 mgmt = first_nonempty(mgmt, block.get_text())
 
-    if follow_mgmt and mgmt_url:
-        polite_sleep(delay_min, delay_max)
-        r2 = safe_get(session, mgmt_url, 25)
-        if r2 and r2.ok and not looks_blocked(r2.text):
-            s2 = BeautifulSoup(r2.text, "html.parser")
-            if not email:
-                m = EMAIL_RE.search(s2.get_text(" ", strip=True))
-                if m:
-                    email = m.group(0)
-            if not phone:
-                t2 = s2.select_one('a[href^="tel:"]')
-                if t2:
-                    phone = clean_text(t2.get_text() or t2.get("href", "").replace("tel:", ""))
-            if not email:
-                mlinks = [a.get("href") for a in s2.select('a[href^="mailto:"]')]
-                mlinks = [x.replace("mailto:", "") for x in mlinks if x]
-                if mlinks:
-                    email = clean_text(mlinks[0])
-
     return {
         "Property Name": name,
         "Address": address,
@@ -436,52 +558,183 @@ def rentcafe_extract_details(session: requests.Session, url: str, follow_mgmt: b
         "Email": email,
         "Source URL": url,
         "Mgmt URL": mgmt_url,
-        "Source": "RentCafe",
+        "Source": conf["source"],
     }
 
+# ----------------------------
+# Cached detail extraction (warm reruns skip the network)
+# ----------------------------
+
+
+class NoDetails(Exception):
+    # Raised inside the cached functions so blocked/failed pages are never cached
+    pass
+
+
+@st.cache_data(ttl=3600, show_spinner=False, max_entries=5000)
+def cached_property_details(_session: requests.Session, source: str, url: str,
+                            _delay_min: float, _delay_max: float) -> Dict:
+    row = extract_details(_session, url, SITE_CONF[source], _delay_min, _delay_max)
+    if row is None:
+        raise NoDetails(url)
+    return row
+
+
+def get_property_details(session: requests.Session, source: str, url: str, follow_mgmt: bool,
+                         delay_min: float, delay_max: float) -> Optional[Dict]:
+    try:
+        row = cached_property_details(session, source, url, delay_min, delay_max)
+    except NoDetails:
+        return None
+    # Enrichment sits outside the row cache (it has its own, which skips failed
+    # fetches), so a blocked mgmt site doesn't pin blank Email/Phone for an hour
+    if follow_mgmt and row["Mgmt URL"]:
+        info = enrich_from_mgmt_site(session, row["Mgmt URL"], delay_min, delay_max)
+        row = {**row, "Email": row["Email"] or info["email"], "Phone": row["Phone"] or info["phone"]}
+    return row
+
+
+@st.cache_data(ttl=900, show_spinner=False, max_entries=500)
+def cached_listing_links(_session: requests.Session, source: str, url: str, _collect_links,
+                         _delay_min: float, _delay_max: float, _parse_only: Optional[SoupStrainer] = None) -> List[str]:
+    # Candidate property links of one listing page, in page order. Shorter TTL
+    # than details: listings change as units are let.
+    r = safe_get(_session, url, delay=(_delay_min, _delay_max))
+    if not (r and r.ok):
+        raise NoDetails(url)
+    if looks_blocked(r.content):
+        st.warning(f"{source} listing page looks blocked by anti-bot. Try smaller pages, increase delay, or Manual URLs mode.")
+        raise NoDetails(url)
+    soup = make_soup(r, parse_only=_parse_only)
+    links = list(_collect_links(soup, url, {normalize_link(url, url)}))
+    if not links:
+        # Soft block / JS-only shell: don't pin "no links" for the TTL
+        raise NoDetails(url)
+    return links
+
+
+def get_listing_links(session: requests.Session, source: str, url: str, collect_links,
+                      delay_min: float, delay_max: float, parse_only: Optional[SoupStrainer] = None) -> Optional[List[str]]:
+    try:
+        return cached_listing_links(session, source, url, collect_links, delay_min, delay_max, parse_only)
+    except NoDetails:
+        return None
+
 # ----------------------------
 # Generic enrichment (Entrata/Yardi/etc.)
 # ----------------------------
 
-def generic_enrich_site(session: requests.Session, url: str) -> Dict[str, str]:
+def generic_enrich_site(session: requests.Session, url: str,
+                        delay: Optional[Tuple[float, float]] = None) -> Optional[Dict[str, str]]:
+    # None when the fetch failed or was blocked (retry later); a dict, possibly
+    # blank, when the page was read
     info = {"email": "", "phone": ""}
-    r = safe_get(session, url, 25)
-    if not (r and r.ok) or looks_blocked(r.text):
+    r = safe_get(session, url, delay=delay)
+    if not (r and r.ok) or looks_blocked(r.content):
+        return None
+    # Only three lookups are needed here, so query the lxml tree directly with
+    # XPath (evaluated in C) rather than wrapping every node in a bs4 Tag.
+    # Blank or comment-only pages raise "Document is empty": no contacts there.
+    # As in make_soup, pin a header-declared charset (libxml2 would otherwise
+    # read meta-less UTF-8 as Latin-1); undeclared, let libxml2 sniff <meta>.
+    parser = None
+    if "charset=" in r.headers.get("Content-Type", "").lower():
+        try:
+            parser = lxml.html.HTMLParser(encoding=r.encoding)
+        except LookupError:
+            parser = None
+    try:
+        root = lxml.html.document_fromstring(r.content, parser=parser)
+    except (lxml.etree.ParserError, ValueError):
         return info
-    s = BeautifulSoup(r.text, "html.parser")
-    m = EMAIL_RE.search(s.get_text(" ", strip=True))
-    if m:
-        info["email"] = clean_text(m.group(0))
+    # Same text as bs4's get_text(" ", strip=True): visible strings only
+    strings = root.xpath("//text()[not(ancestor::script or ancestor::style or ancestor::template)]")
+    text_email, text_phone = scan_contacts(" ".join(t.strip() for t in strings if t.strip()))
+    if text_email:
+        info["email"] = clean_text(text_email)
     else:
-        mailtos = [a.get("href") for a in s.select('a[href^="mailto:"]')]
-        mailtos = [x.replace("mailto:", "") for x in mailtos if x]
+        mailtos = [x.replace("mailto:", "") for x in root.xpath('//a[starts-with(@href, "mailto:")]/@href')]
+        mailtos = [x for x in mailtos if x]
         if mailtos:
             info["email"] = clean_text(mailtos[0])
     if not info["phone"]:
-        tel = s.select_one('a[href^="tel:"]')
-        if tel:
-            info["phone"] = clean_text(tel.get_text() or tel.get("href", "").replace("tel:", ""))
-        else:
-            m2 = PHONE_RE.search(s.get_text(" ", strip=True))
-            if m2:
-                info["phone"] = clean_text(m2.group(0))
+        tels = root.xpath('//a[starts-with(@href, "tel:")]')
+        if tels:
+            info["phone"] = clean_text(tels[0].text_content() or tels[0].get("href", "").replace("tel:", ""))
+        elif text_phone:
+            info["phone"] = clean_text(text_phone)
+    return info
+
+@st.cache_data(ttl=3600, show_spinner=False, max_entries=2000)
+def cached_mgmt_info(_session: requests.Session, mgmt_url: str,
+                     _delay_min: float, _delay_max: float) -> Dict[str, str]:
+    info = generic_enrich_site(_session, mgmt_url, delay=(_delay_min, _delay_max))
+    if info is None:
+        raise NoDetails(mgmt_url)
+    return info
+
+
+# One management site serves many properties: enrich each URL once per run.
+# Keyed by URL, not host: mgmt links are often on the listing site itself
+# (/pmc/<company>/) or a shared portal, where one host means many companies.
+# A per-key lock makes concurrent workers wait for the first fetch.
+MGMT_CACHE: Dict[str, Dict[str, str]] = {}
+_mgmt_locks: Dict[str, threading.Lock] = {}
+_mgmt_locks_lock = threading.Lock()
+
+def enrich_from_mgmt_site(session: requests.Session, mgmt_url: str,
+                          delay_min: float, delay_max: float) -> Dict[str, str]:
+    key = urlparse(mgmt_url)._replace(query="", fragment="").geturl()
+    with _mgmt_locks_lock:
+        lock = _mgmt_locks.get(key)
+        if lock is None:
+            lock = _mgmt_locks[key] = threading.Lock()
+    with lock:
+        info = MGMT_CACHE.get(key)
+        if info is None:
+            try:
+                info = cached_mgmt_info(session, mgmt_url, delay_min, delay_max)
+            except NoDetails:
+                info = {"email": "", "phone": ""}  # blank for this run only
+            MGMT_CACHE[key] = info
     return info
 
 # ----------------------------
 # Messaging helpers
 # ----------------------------
 
+# Static template text, joined once at import; only the per-property lines are
+# formatted per row
+CALL_SCRIPT_TAIL = "\n\n".join([
+    "We specialize in **fast, cost-effective flooring replacements** for multifamily turns — "
+    "SPC waterproof vinyl, LVT glue-down, and carpet tile. We handle quick turnarounds and "
+    "keep units rent-ready.",
+    "We work across Miami-Dade & Broward and can provide references and insurance on request.",
+    "Could we schedule a quick walkthrough or let me send pricing options for your upcoming turns?",
+    "What’s the best email to send our pricing sheet and availability?",
+])
+EMAIL_INTRO = (
+    "We help multifamily communities in Miami-Dade & Broward with **fast, cost-effective flooring replacements** "
+    "(SPC waterproof vinyl, LVT glue-down, carpet tile). Our crews handle turnarounds quickly to keep units rent-ready."
+)
+EMAIL_TAIL = "\n".join([
+    "",
+    "**Why us**",
+    "• Quick scheduling + reliable crews",
+    "• Competitive pricing and high-durability materials",
+    "• Licensed & insured",
+    "",
+    "I’d love to **send pricing options** or walk a unit/building this week.",
+    "What’s the best email/phone for the community manager?",
+    "",
+    "Thanks,",
+    "Luis Gonzalez\nMiami Master Flooring\ninfo@miamimasterflooring.com | (305) 555-0123",
+])
+
+
 def build_call_script(property_name: str, address: str, mgmt: str) -> str:
     opener = f"Hi, this is Luis with Miami Master Flooring. Is the property manager available for {property_name or 'your community'}?"
-    value = (
-        "We specialize in **fast, cost-effective flooring replacements** for multifamily turns — "
-        "SPC waterproof vinyl, LVT glue-down, and carpet tile. We handle quick turnarounds and "
-        "keep units rent-ready."
-    )
-    proof = "We work across Miami-Dade & Broward and can provide references and insurance on request."
-    ask = "Could we schedule a quick walkthrough or let me send pricing options for your upcoming turns?"
-    close = "What’s the best email to send our pricing sheet and availability?"
-    parts = [opener, value, proof, ask, close]
+    parts = [opener, CALL_SCRIPT_TAIL]
     if address:
         parts.insert(1, f"(I’m calling about the community at {address}.)")
     if mgmt:
@@ -489,35 +742,126 @@ def build_call_script(property_name: str, address: str, mgmt: str) -> str:
     return "\n\n".join(parts)
 
 
-def build_email_template(property_name: str, address: str, mgmt: str) -> Dict[str, str]:
+def build_email_template(property_name: str, address: str, mgmt: str) -> Tuple[str, str]:
+    # Returns (subject, body)
     subj = f"{property_name or 'Your Community'} — Fast, budget-friendly flooring turns (SPC/LVT/Carpet Tile)"
-    body_lines = []
-    greet = f"Hi {mgmt}," if mgmt else "Hi there,"
-    body_lines.append(greet)
-    body_lines.append("")
-    body_lines.append(
-        "We help multifamily communities in Miami-Dade & Broward with **fast, cost-effective flooring replacements** "
-        "(SPC waterproof vinyl, LVT glue-down, carpet tile). Our crews handle turnarounds quickly to keep units rent-ready."
-    )
+    body_lines = [f"Hi {mgmt}," if mgmt else "Hi there,", "", EMAIL_INTRO]
     if property_name or address:
         body_lines.append(f"Ref: **{property_name or 'your community'}** — {address}")
-    body_lines.append("")
-    body_lines.append("**Why us**")
-    body_lines.append("• Quick scheduling + reliable crews")
-    body_lines.append("• Competitive pricing and high-durability materials")
-    body_lines.append("• Licensed & insured")
-    body_lines.append("")
-    body_lines.append("I’d love to **send pricing options** or walk a unit/building this week.")
-    body_lines.append("What’s the best email/phone for the community manager?")
-    body_lines.append("")
-    body_lines.append("Thanks,")
-    body_lines.append("Luis Gonzalez\nMiami Master Flooring\ninfo@miamimasterflooring.com | (305) 555-0123")
-    return {"subject": subj, "body": "\n".join(body_lines)}
+    body_lines.append(EMAIL_TAIL)
+    return subj, "\n".join(body_lines)
+
+# ----------------------------
+# Export helpers
+# ----------------------------
+
+def as_text(df: pd.DataFrame) -> pd.DataFrame:
+    # Missing cells as "" whatever the column dtype (object, Arrow string,
+    # category): merged uploads bring NaN into columns fillna("") can't touch
+    return df.astype(object).where(df.notna(), "")
+
+
+# Cached on the DataFrame's content: reruns that don't change the results
+# (any widget interaction) reuse the serialized bytes
+@st.cache_data(show_spinner=False, max_entries=4)
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    if HAS_PYARROW:
+        # Arrow's vectorized, multi-threaded CSV writer (standard quoting kept:
+        # Email Body / Call Script contain commas and newlines)
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        buf = io.BytesIO()
+        pa_csv.write_csv(pa.Table.from_pandas(as_text(df).astype(str), preserve_index=False), buf)
+        return buf.getvalue()
+    # pandas encodes straight into the binary buffer (no whole-CSV str + .encode copy)
+    buf = io.BytesIO()
+    df.to_csv(buf, index=False, lineterminator="\n", encoding="utf-8")
+    return buf.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def to_xlsx_bytes(df: pd.DataFrame, sheet_name: str = "Leads") -> bytes:
+    # constant_memory flushes each row once the next one starts, so rows must be
+    # written strictly in order; pandas' to_excel writes column by column, hence
+    # the direct xlsxwriter loop. strings_to_urls=False: Source/Mgmt URL cells stay
+    # plain text instead of being parsed into hyperlinks one by one;
+    # strings_to_formulas=False: scraped text starting with "=" stays text.
+    df = as_text(df)  # merged uploads may carry NaN, which write_row rejects
+    buf = io.BytesIO()
+    # Merged uploads may bring datetime columns: give them a visible format and
+    # drop tz info (xlsxwriter rejects tz-aware datetimes)
+    wb = xlsxwriter.Workbook(buf, {"constant_memory": True, "strings_to_urls": False,
+                                   "strings_to_formulas": False,
+                                   "default_date_format": "yyyy-mm-dd hh:mm:ss", "remove_timezone": True})
+    ws = wb.add_worksheet(sheet_name)
+    ws.write_row(0, 0, list(df.columns), wb.add_format({"bold": True}))
+    for i, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        ws.write_row(i, 0, row)
+    wb.close()
+    return buf.getvalue()
+
+
+# Columnar formats (need pyarrow). All-text frame: merged uploads can mix
+# str/float in one column, which Arrow won't infer a type for.
+@st.cache_data(show_spinner=False, max_entries=4)
+def to_parquet_bytes(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    as_text(df).astype(str).to_parquet(buf, engine="pyarrow", compression="zstd", index=False)
+    return buf.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def to_feather_bytes(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    as_text(df).astype(str).reset_index(drop=True).to_feather(buf, compression="lz4")
+    return buf.getvalue()
+
+
+def show_preview(df: pd.DataFrame, height: int):
+    # Long Call Script/Email Body cells make the full frame multi-MB per rerun
+    st.dataframe(df.head(PREVIEW_ROWS), use_container_width=True, height=height)
+    if len(df) > PREVIEW_ROWS:
+        st.caption(f"Showing first {PREVIEW_ROWS} of {len(df)} rows — download for full data.")
+
+# ----------------------------
+# Merge helpers
+# ----------------------------
+
+def key_hashes(df: pd.DataFrame, cols: List[str]) -> pd.Series:
+    # One 64-bit hash per row over the key columns, compared as text (so an
+    # uploaded numeric Phone or a NaN matches the scraped string / "")
+    return pd.util.hash_pandas_object(as_text(df[cols]).astype(str), index=False)
+
+
+def merge_dedupe(base_df: pd.DataFrame, new_df: pd.DataFrame, cols: List[str]) -> pd.DataFrame:
+    # First occurrence wins, base rows before uploaded rows (as concat +
+    # drop_duplicates), but only the key columns are hashed, once per frame
+    if not cols:
+        # Nothing selected to dedupe on (drop_duplicates(subset=[]) raises)
+        return pd.concat([base_df, new_df], ignore_index=True)
+    if not (set(cols) <= set(base_df.columns) and set(cols) <= set(new_df.columns)):
+        return pd.concat([base_df, new_df], ignore_index=True).drop_duplicates(subset=cols, ignore_index=True)
+    base_h = key_hashes(base_df, cols)
+    new_h = key_hashes(new_df, cols)
+    keep_new = ~(new_h.isin(base_h) | new_h.duplicated())
+    return pd.concat([base_df[~base_h.duplicated().to_numpy()], new_df[keep_new.to_numpy()]], ignore_index=True)
 
 # ----------------------------
 # Google Sheets (Service Account)
 # ----------------------------
 
+@st.cache_resource(show_spinner=False)
+def authorize_gs_client(svc_json: str):
+    # Keyed on the service-account JSON: pushes reuse one client (and its OAuth
+    # token) until the secret changes. Failures raise, so they aren't cached.
+    scopes = [
+        "https://www.googleapis.com/auth/spreadsheets",
+        "https://www.googleapis.com/auth/drive",
+    ]
+    creds = Credentials.from_service_account_info(json.loads(svc_json), scopes=scopes)
+    return gspread.authorize(creds)
+
+
 def get_gs_client_from_secrets():
     if not HAS_GSHEETS:
         return None, "gspread/google-auth not installed"
@@ -525,15 +869,8 @@ def get_gs_client_from_secrets():
         svc_info = st.secrets.get("gcp_service_account", None)
         if not svc_info:
             return None, "Missing st.secrets['gcp_service_account']"
-        if isinstance(svc_info, str):
-            svc_info = json.loads(svc_info)
-        scopes = [
-            "https://www.googleapis.com/auth/spreadsheets",
-            "https://www.googleapis.com/auth/drive",
-        ]
-        creds = Credentials.from_service_account_info(svc_info, scopes=scopes)
-        client = gspread.authorize(creds)
-        return client, None
+        svc_json = svc_info if isinstance(svc_info, str) else json.dumps(dict(svc_info), sort_keys=True)
+        return authorize_gs_client(svc_json), None
     except Exception as e:
         return None, str(e)
 
@@ -552,12 +889,11 @@ def append_to_sheet(df: pd.DataFrame, spreadsheet_id: str, worksheet_name: str)
             ws = sh.worksheet(worksheet_name)
         except Exception:
             ws = sh.add_worksheet(title=worksheet_name, rows="1000", cols="26")
-        existing = ws.get_all_values()
-        if not existing:
-            ws.append_row(list(df.columns))
-        rows = df.astype(str).values.tolist()
-        for r in rows:
-            ws.append_row(r)
+        # Header probe reads row 1 only; header (if needed) + rows go up in one
+        # values:append call
+        rows = as_text(df).astype(str).values.tolist()  # merged uploads may carry NaN
+        header = [] if ws.row_values(1) else [list(df.columns)]
+        ws.append_rows(header + rows, value_input_option="RAW")
         return f"Appended {len(rows)} rows to '{worksheet_name}'."
     except Exception as e:
         return f"Append failed: {e}"
@@ -595,6 +931,13 @@ referer_hint = st.text_input("Optional Referer header (can slightly reduce block
 
 go = st.button("🚀 Start Scan")
 
+# Fetched pages are cached for warm reruns (details + mgmt sites 1h, listings 15m)
+if st.button("🧹 Clear cached pages"):
+    cached_listing_links.clear()
+    cached_property_details.clear()
+    cached_mgmt_info.clear()
+    st.success("Page cache cleared. The next scan fetches everything fresh.")
+
 # Session storage
 if "results" not in st.session_state:
     st.session_state["results"] = pd.DataFrame(
@@ -608,6 +951,47 @@ if "results" not in st.session_state:
 # Crawl helpers per source
 # ----------------------------
 
+def collect_listing_links(session: requests.Session, listing_urls: List[str], collect_links, source: str,
+                          delay_min: float, delay_max: float, parse_only: Optional[SoupStrainer] = None) -> List[str]:
+    def fetch_one(lu: str) -> Optional[List[str]]:
+        return get_listing_links(session, source, lu, collect_links, delay_min, delay_max, parse_only)
+
+    by_page = {}
+    progress = st.progress(0)
+    for i, (lu, links) in enumerate(run_parallel(fetch_one, listing_urls), start=1):
+        by_page[lu] = links
+        report_progress(progress, i, len(listing_urls))
+
+    # Pages finish out of order; merge in listing-page order against one
+    # shared seen set, so links come out already de-duplicated
+    # Seeded with the listing pages themselves so links back to them are skipped
+    seen: Set[str] = {lu.split("?")[0].rstrip("/") for lu in listing_urls}
+    prop_links = []
+    for lu in listing_urls:
+        for u in by_page[lu] or ():
+            if u not in seen:
+                seen.add(u)
+                prop_links.append(u)
+    return prop_links
+
+
+def collect_detail_rows(fetch_one, urls: List[str], label: str = "") -> List[Dict]:
+    # Progress follows completion, but rows come back in urls order, so the
+    # output (and which row wins the keep="first" dedupe) is the same every run
+    bar = st.progress(0)
+    status = st.empty() if label else None
+    by_url = {}
+    for idx, (url, row) in enumerate(run_parallel(fetch_one, urls), start=1):
+        by_url[url] = row
+        report_progress(bar, idx, len(urls), status, f"{label} [{idx}/{len(urls)}]: {url}" if label else "")
+    rows = []
+    for url in urls:
+        row = by_url.get(url)
+        if row and (row["Property Name"] or row["Address"]):
+            rows.append(row)
+    return rows
+
+
 def scan_apartments(session: requests.Session, city: str, state: str, pages: int, max_props: int,
                     follow_mgmt: bool, delay_min: float, delay_max: float, base_url_override: str = "") -> List[Dict]:
     results = []
@@ -618,42 +1002,25 @@ def scan_apartments(session: requests.Session, city: str, state: str, pages: int
             listing_urls.append(base if p == 1 else f"{base}?page={p}")
             if p > 1:
                 listing_urls.append(urljoin(base, f"{p}/"))
-        seen = set(); listing_urls = [u for u in listing_urls if not (u in seen or seen.add(u))]
+        listing_urls = list(dict.fromkeys(listing_urls))
     else:
         listing_urls = apts_build_listing_urls(city, state, pages)
 
     st.info(f"Apartments.com: scanning up to {len(listing_urls)} listing pages…")
-    prop_links = []
-    progress = st.progress(0)
-    for i, lu in enumerate(listing_urls, start=1):
-        polite_sleep(delay_min, delay_max)
-        session.headers["Referer"] = referer_hint or ""
-        r = safe_get(session, lu)
-        if not (r and r.ok):
-            continue
-        if looks_blocked(r.text):
-            st.warning("Apartments.com listing page looks blocked by anti-bot. Try smaller pages, increase delay, or Manual URLs mode.")
-            continue
-        soup = BeautifulSoup(r.text, "html.parser")
-        links = apts_collect_property_links(soup, lu)
-        prop_links.extend(links)
-        progress.progress(min(i/len(listing_urls), 1.0))
-
-    prop_links = list(dict.fromkeys(prop_links))
+    session.headers["Referer"] = referer_hint or ""
+    prop_links = collect_listing_links(session, listing_urls, apts_collect_property_links, "Apartments.com",
+                                       delay_min, delay_max, parse_only=LISTING_STRAINER)
     if not prop_links:
         st.warning("Apartments.com: no property links found (likely blocked or HTML changed). Try Manual URLs mode or a different city.")
         return results
 
     st.write(f"🔎 Apartments.com candidates: **{len(prop_links)}**")
-    detail_prog = st.progress(0)
-    for idx, url in enumerate(prop_links[:max_props], start=1):
-        st.caption(f"Apartments.com [{idx}/{min(len(prop_links), max_props)}]: {url}")
-        polite_sleep(delay_min, delay_max)
-        row = apts_extract_details(session, url, follow_mgmt, delay_min, delay_max)
-        if row and (row["Property Name"] or row["Address"]):
-            results.append(row)
-        detail_prog.progress(min(idx/max_props, 1.0))
-    return results
+    targets = prop_links[:max_props]
+
+    def fetch_one(url: str) -> Optional[Dict]:
+        return get_property_details(session, "apartments.com", url, follow_mgmt, delay_min, delay_max)
+
+    return collect_detail_rows(fetch_one, targets, "Apartments.com")
 
 
 def scan_rentcafe(session: requests.Session, city: str, state: str, pages: int, max_props: int,
@@ -665,36 +1032,19 @@ def scan_rentcafe(session: requests.Session, city: str, state: str, pages: int,
         listing_urls = rentcafe_build_listing_urls(city, state, pages)
 
     st.info(f"RentCafe: scanning up to {len(listing_urls)} listing pages…")
-    prop_links = []
-    progress = st.progress(0)
-    for i, lu in enumerate(listing_urls, start=1):
-        polite_sleep(delay_min, delay_max)
-        session.headers["Referer"] = referer_hint or ""
-        r = safe_get(session, lu)
-        if not (r and r.ok):
-            continue
-        if looks_blocked(r.text):
-            st.warning("RentCafe listing page looks blocked by anti-bot. Try smaller pages, increase delay, or Manual URLs mode.")
-            continue
-        soup = BeautifulSoup(r.text, "html.parser")
-        prop_links.extend(rentcafe_collect_property_links(soup, lu))
-        progress.progress(min(i/len(listing_urls), 1.0))
-
-    prop_links = list(dict.fromkeys(prop_links))
+    session.headers["Referer"] = referer_hint or ""
+    prop_links = collect_listing_links(session, listing_urls, rentcafe_collect_property_links, "RentCafe", delay_min, delay_max)
     if not prop_links:
         st.warning("RentCafe: no property links found (likely blocked or HTML changed). Try Manual URLs mode or a different city.")
         return results
 
     st.write(f"🔎 RentCafe candidates: **{len(prop_links)}**")
-    detail_prog = st.progress(0)
-    for idx, url in enumerate(prop_links[:max_props], start=1):
-        st.caption(f"RentCafe [{idx}/{min(len(prop_links), max_props)}]: {url}")
-        polite_sleep(delay_min, delay_max)
-        row = rentcafe_extract_details(session, url, follow_mgmt, delay_min, delay_max)
-        if row and (row["Property Name"] or row["Address"]):
-            results.append(row)
-        detail_prog.progress(min(idx/max_props, 1.0))
-    return results
+    targets = prop_links[:max_props]
+
+    def fetch_one(url: str) -> Optional[Dict]:
+        return get_property_details(session, "rentcafe.com", url, follow_mgmt, delay_min, delay_max)
+
+    return collect_detail_rows(fetch_one, targets, "RentCafe")
 
 # ----------------------------
 # Main Run
@@ -716,18 +1066,14 @@ if go:
             st.error("Paste at least one property URL.")
             st.stop()
         st.info(f"Processing {len(urls)} pasted property URLs…")
-        detail_prog = st.progress(0)
-        for i, url in enumerate(urls, start=1):
-            polite_sleep(delay_min, delay_max)
-            if "apartments.com" in url:
-                row = apts_extract_details(session, url, follow_mgmt, delay_min, delay_max)
-            elif "rentcafe.com" in url:
-                row = rentcafe_extract_details(session, url, follow_mgmt, delay_min, delay_max)
-            else:
-                row = None
-            if row and (row["Property Name"] or row["Address"]):
-                all_rows.append(row)
-            detail_prog.progress(min(i/len(urls), 1.0))
+
+        def fetch_one(url: str) -> Optional[Dict]:
+            source = site_key(url)
+            if source is None:
+                return None
+            return get_property_details(session, source, url, follow_mgmt, delay_min, delay_max)
+
+        all_rows.extend(collect_detail_rows(fetch_one, urls))
     else:
         # apartments.com
         if use_apartments:
@@ -748,40 +1094,32 @@ if go:
         st.error("No properties parsed. Try fewer pages, increase delays, switch source/mode, or paste URLs manually.")
         st.stop()
 
-    df = pd.DataFrame(all_rows).fillna("")
-    df = df.drop_duplicates(subset=["Source URL"]).reset_index(drop=True)
-    if df.duplicated(subset=["Property Name", "Address"]).any():
-        df = df.drop_duplicates(subset=["Property Name", "Address"]).reset_index(drop=True)
-
-    # Messaging columns
-    call_scripts, email_subjects, email_bodies = [], [], []
-    for _, r in df.iterrows():
-        script = build_call_script(r.get("Property Name", ""), r.get("Address", ""), r.get("Management Company", ""))
-        email = build_email_template(r.get("Property Name", ""), r.get("Address", ""), r.get("Management Company", ""))
-        call_scripts.append(script)
-        email_subjects.append(email["subject"])
-        email_bodies.append(email["body"])
-    df["Call Script"] = call_scripts
-    df["Email Subject"] = email_subjects
-    df["Email Body"] = email_bodies
+    # First row per Source URL, in scan order (every row has all columns, so no NaN)
+    by_url: Dict[str, Dict] = {}
+    for row in all_rows:
+        by_url.setdefault(row["Source URL"], row)
+    df = pd.DataFrame(list(by_url.values()))
+    if HAS_PYARROW:
+        # Arrow-backed strings: contiguous buffers for dedupe hashing, less memory
+        df = df.astype("string[pyarrow]")
+    df = df.drop_duplicates(subset=["Property Name", "Address"], keep="first", ignore_index=True)
+    # A handful of managers/sources repeat across hundreds of rows: store as codes
+    # (to_numpy() below still hands the templates plain str; exports go through
+    # as_text, which copes with the NaN a merge can add to these columns)
+    df = df.astype({"Management Company": "category", "Source": "category"})
+
+    # Messaging columns (zip over the raw column arrays; iterrows builds a Series per row)
+    triples = list(zip(df["Property Name"].to_numpy(), df["Address"].to_numpy(), df["Management Company"].to_numpy()))
+    df["Call Script"] = [build_call_script(n, a, m) for n, a, m in triples]
+    subjects, bodies = zip(*[build_email_template(n, a, m) for n, a, m in triples])
+    df["Email Subject"] = list(subjects)
+    df["Email Body"] = list(bodies)
 
     st.success(f"✅ Done! Parsed **{len(df)}** properties.")
-    st.dataframe(df, use_container_width=True, height=480)
+    show_preview(df, height=480)
 
     st.session_state["results"] = df
 
-    # Downloads
-    csv_bytes = df.to_csv(index=False).encode("utf-8")
-    xls_buf = io.BytesIO()
-    with pd.ExcelWriter(xls_buf, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name="Leads")
-    xls_buf.seek(0)
-
-    colA, colB = st.columns(2)
-    colA.download_button("⬇️ Download CSV", data=csv_bytes, file_name="multifamily_leads.csv", mime="text/csv")
-    colB.download_button("⬇️ Download Excel (XLSX)", data=xls_buf, file_name="multifamily_leads.xlsx",
-                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
 # ----------------------------
 # Utilities: Merge / Dedupe / Google Sheets
 # ----------------------------
@@ -800,15 +1138,30 @@ with u3:
 
 if run_merge and uploaded:
     if uploaded.name.lower().endswith(".csv"):
-        new_df = pd.read_csv(uploaded)
+        new_df = pd.read_csv(uploaded, engine="pyarrow" if HAS_PYARROW else None)
     else:
-        new_df = pd.read_excel(uploaded)
+        new_df = pd.read_excel(uploaded, engine="calamine" if HAS_CALAMINE else None)
     base_df = st.session_state.get("results", pd.DataFrame())
-    merged = pd.concat([base_df, new_df], ignore_index=True)
-    merged = merged.drop_duplicates(subset=dedupe_cols).reset_index(drop=True)
+    merged = merge_dedupe(base_df, new_df, dedupe_cols)
     st.session_state["results"] = merged
     st.success(f"Merged! Combined rows: **{len(merged)}**")
-    st.dataframe(merged, use_container_width=True, height=420)
+    show_preview(merged, height=420)
+
+# Downloads render from the stored results on every rerun (scan or merge),
+# so they don't disappear after the next widget interaction
+results_df = st.session_state["results"]
+if not results_df.empty:
+    st.markdown("### ⬇️ Downloads")
+    colA, colB = st.columns(2)
+    colA.download_button("⬇️ Download CSV", data=to_csv_bytes(results_df), file_name="multifamily_leads.csv", mime="text/csv")
+    colB.download_button("⬇️ Download Excel (XLSX)", data=to_xlsx_bytes(results_df, "Leads"), file_name="multifamily_leads.xlsx",
+                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    if HAS_PYARROW:
+        colC, colD = st.columns(2)
+        colC.download_button("⬇️ Download Parquet", data=to_parquet_bytes(results_df), file_name="multifamily_leads.parquet",
+                             mime="application/vnd.apache.parquet")
+        colD.download_button("⬇️ Download Feather", data=to_feather_bytes(results_df), file_name="multifamily_leads.feather",
+                             mime="application/vnd.apache.arrow.file")
 
 st.markdown("### 📤 Google Sheets Export")
 if not HAS_GSHEETS: